@@ -11,20 +11,29 @@ os.environ['TQDM_DISABLE'] = '1'
 os.environ['TQDM_MININTERVAL'] = '99999'
 
 import tempfile
+import shutil
+import io
+import hashlib
 import wave
 import json
 import threading
+import queue
 import numpy as np
 import logging
 import time
-from flask import Flask, request, jsonify, send_file
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from flask import Flask, Response, request, send_file
 from flask_socketio import SocketIO, emit
 from flask_cors import CORS
 from funasr import AutoModel
 from funasr.utils.postprocess_utils import rich_transcription_postprocess
 import soundfile as sf
 import librosa
+import soxr
 import requests
+import orjson
 import re
 import traceback
 import emoji
@@ -41,12 +50,29 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'asr-api-server'
 CORS(app)  # 允许跨域请求
 
+class _OrjsonCodec:
+    """Socket.IO 数据包的 JSON 编解码（orjson 实现）
+    
+    每个音频 chunk 都会推送一次 transcription 事件，orjson 编码更快且中文不转义；
+    输出仍是标准 JSON 文本，前端无需改动。
+    """
+    
+    @staticmethod
+    def dumps(obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY).decode()
+    
+    @staticmethod
+    def loads(s, **kwargs):
+        return orjson.loads(s)
+
+
 # SocketIO 配置（优化长时间录音稳定性）
 socketio = SocketIO(
     app, 
     cors_allowed_origins="*", 
     async_mode='threading',
     async_handlers=False,
+    json=_OrjsonCodec,
     # 增加 ping 超时时间（默认20秒太短，长时间录音可能超时）
     ping_timeout=120,  # 120秒超时
     ping_interval=30,  # 每30秒发送一次ping
@@ -59,6 +85,13 @@ asr_model = None
 punc_realtime_model = None  # 实时标点模型
 vad_model = None  # VAD语音端点检测模型
 sensevoice_model = None
+model_device = "cpu"  # 模型所在设备（init_models 中检测）
+model_streams = {}  # CUDA 上各流式模型独立的 CUDA stream（init_models 中创建）
+models_ready = threading.Event()  # 所有模型加载并预热完成后置位（模型在后台线程加载；加载失败时也置位以唤醒等待方）
+models_load_error = None  # 模型加载失败的原因（加载成功或仍在加载时为 None）
+
+# 模型尚未就绪时，文件转录请求最多等待的秒数（超时返回 503）
+MODELS_READY_TIMEOUT_S = 30
 
 # 全局模型推理锁（threading 模式下避免并发推理导致缓存/内部状态竞争）
 asr_model_lock = threading.Lock()
@@ -66,8 +99,24 @@ punc_model_lock = threading.Lock()
 vad_model_lock = threading.Lock()
 sensevoice_model_lock = threading.Lock()
 
+# 录音过程中提前复检：距上次复检位置累计超过该时长（秒）且 VAD 检测到语音结束时，
+# 在后台对这段音频运行 SenseVoice，停止录音后只需复检剩余部分
+SENSEVOICE_RECHECK_MIN_S = 60
+
+# 实时标点以 VAD 语音结束为主；持续说话未断句时按此间隔（毫秒）兜底处理一次
+PUNC_FALLBACK_INTERVAL_MS = 3000
+
+# 静音门限：VAD 判定非语音且 chunk 均方能量低于该值（约 -40 dBFS）时跳过流式 ASR
+ASR_SILENCE_ENERGY = 1e-4
+# 语音结束后仍送入 ASR 的静音 chunk 数，保证 Paraformer 的前瞻窗口把句尾文字吐完
+ASR_SILENCE_HANGOVER_CHUNKS = 2
+
 # 支持的音频格式
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'flac', 'm4a', 'aac', 'wma', 'webm'}
+# 预先归一化（小写、无点号）的扩展名集合，供 allowed_file 直接查表
+_ALLOWED_EXTENSIONS = frozenset(ext.lower().lstrip('.') for ext in ALLOWED_EXTENSIONS)
+# libsndfile 可直接从内存解码的格式：上传后不落盘，省去临时文件的写入与删除
+_IN_MEMORY_EXTENSIONS = frozenset({'wav', 'flac', 'ogg'})
 
 # 模型缓存目录（Docker挂载或本地目录）
 # 优先使用环境变量，其次使用项目目录下的 models_cache
@@ -76,9 +125,55 @@ MODELS_CACHE_DIR = os.environ.get('MODELSCOPE_CACHE',
 HF_CACHE_DIR = os.environ.get('HF_HOME',
     os.path.join(os.path.dirname(__file__), 'hf_cache'))
 
+# 文件转录接口允许的最大音频时长（秒），超出直接拒绝（413），避免超长文件长时间占用模型
+MAX_AUDIO_DURATION_S = float(os.environ.get('MAX_AUDIO_DURATION_S', 3 * 3600))
+
+# 文件转录接口同时处理的最大请求数（解码与推理均为 CPU/GPU 密集型）
+TRANSCRIBE_MAX_CONCURRENCY = min(4, os.cpu_count() or 1)
+_transcribe_slots = threading.BoundedSemaphore(TRANSCRIBE_MAX_CONCURRENCY)
+
+# 录音过程中提前复检 SenseVoice 的后台线程
+_sensevoice_recheck_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='sv-recheck')
+
+# 实时标点后台线程（标点模型本身由 punc_model_lock 串行化，单线程即可）
+_punc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='punc')
+
+# 文件转录结果缓存（按上传内容哈希 + 是否生成时间戳，LRU 淘汰）
+RESULT_CACHE_SIZE = 256
+_result_cache = OrderedDict()
+_result_cache_lock = threading.Lock()
+
 # 存储实时录音会话
-active_sessions = {}
-active_sessions_lock = threading.Lock()
+class _ShardedSessions:
+    """按 session_id 分片加锁的会话表
+    
+    每个 audio_data 事件都要查询会话；分片后不同会话只竞争各自分片的锁，
+    避免所有连接争用同一把全局锁。
+    """
+    
+    def __init__(self, num_shards=16):
+        self._shards = [({}, threading.Lock()) for _ in range(num_shards)]
+    
+    def _shard(self, session_id):
+        return self._shards[hash(session_id) % len(self._shards)]
+    
+    def get(self, session_id):
+        sessions, lock = self._shard(session_id)
+        with lock:
+            return sessions.get(session_id)
+    
+    def set(self, session_id, asr):
+        sessions, lock = self._shard(session_id)
+        with lock:
+            sessions[session_id] = asr
+    
+    def pop(self, session_id):
+        sessions, lock = self._shard(session_id)
+        with lock:
+            return sessions.pop(session_id, None)
+
+
+active_sessions = _ShardedSessions()
 
 # ==================== 日志工具 ====================
 
@@ -95,6 +190,28 @@ def _log(msg: str, sid: str = None, level: str = 'INFO'):
     tag = {'INFO': ' ', 'WARN': '!', 'ERROR': 'X'}.get(level, ' ')
     print(f'{tag} {prefix} {msg}')
 
+# 热路径错误日志限流：同一会话同一类错误每 LOG_THROTTLE_INTERVAL_S 秒最多输出一次
+# （异常客户端每秒几十个包都出错时，避免刷屏阻塞 stdout）
+LOG_THROTTLE_INTERVAL_S = 1.0
+_log_throttle_state = {}  # {(sid, key): [上次输出时间, 期间被抑制的次数]}
+_log_throttle_lock = threading.Lock()
+
+def _log_throttled(key: str, msg: str, sid: str = None, level: str = 'ERROR'):
+    """限流版 _log，key 标识错误类别；被抑制的条数在下次输出时附带"""
+    now = time.monotonic()
+    with _log_throttle_lock:
+        state = _log_throttle_state.get((sid, key))
+        if state is not None and now - state[0] < LOG_THROTTLE_INTERVAL_S:
+            state[1] += 1
+            return
+        suppressed = state[1] if state is not None else 0
+        if len(_log_throttle_state) > 1024:
+            _log_throttle_state.clear()
+        _log_throttle_state[(sid, key)] = [now, 0]
+    if suppressed:
+        msg = f'{msg}（期间另有 {suppressed} 条同类错误被省略）'
+    _log(msg, sid, level=level)
+
 # 断连会话保留（宽限期内可恢复）
 # 格式: {original_sid: {'asr': RealtimeASR, 'disconnected_at': float}}
 disconnected_sessions = {}
@@ -127,6 +244,11 @@ _session_cleanup_thread.start()
 AUDIO_BACKUP_DIR = os.path.join(os.path.dirname(__file__), 'audio_backups')
 os.makedirs(AUDIO_BACKUP_DIR, exist_ok=True)
 
+# 上传文件临时目录（仅需落盘解码的格式使用）
+# 可通过环境变量指向 tmpfs（如 /dev/shm/asr_api）避免写盘；注意 Docker 默认 /dev/shm 只有 64MB
+UPLOAD_TMP_DIR = os.environ.get('UPLOAD_TMP_DIR') or tempfile.gettempdir()
+os.makedirs(UPLOAD_TMP_DIR, exist_ok=True)
+
 # 备份文件自动清理（保留7天）
 BACKUP_EXPIRE_SECONDS = 7 * 24 * 60 * 60
 
@@ -156,7 +278,7 @@ def init_models():
     - 如果模型不存在则自动下载到缓存目录
     - Docker运行时通过挂载卷持久化模型，避免重复下载
     """
-    global asr_model, punc_realtime_model, vad_model, sensevoice_model
+    global asr_model, punc_realtime_model, vad_model, sensevoice_model, model_device, model_streams
     
     if asr_model is None:
         print("\n" + "=" * 50)
@@ -190,6 +312,7 @@ def init_models():
         except Exception as e:
             device = "cpu"
             print(f"  设备: CPU（检测失败: {e}）")
+        model_device = device
         
         # FunASR 模型名到实际目录名的映射
         MODEL_DIR_MAP = {
@@ -199,19 +322,49 @@ def init_models():
             "iic/SenseVoiceSmall": "SenseVoiceSmall",
         }
         
+        # 已解析的模型路径缓存：上次启动成功加载后写入，热启动时直接读取，跳过逐个 stat。
+        # 以模型目录的 mtime 作为校验：目录中增删模型后缓存自动失效。
+        # 只记录相对模型目录的目录名：同一缓存目录可能同时被容器（/root/.cache/modelscope）和宿主机挂载使用
+        resolved_cache_path = os.path.join(MODELS_CACHE_DIR, '.resolved.json')
+        models_dir = os.path.join(MODELS_CACHE_DIR, 'models', 'iic')
+        try:
+            models_dir_mtime = os.stat(models_dir).st_mtime_ns
+        except OSError:
+            models_dir_mtime = None
+        resolved_paths = {}
+        if models_dir_mtime is not None:
+            try:
+                with open(resolved_cache_path, 'rb') as f:
+                    cache = orjson.loads(f.read())
+                if cache.get('mtime') == models_dir_mtime:
+                    resolved_paths = cache.get('names', {})
+            except Exception:
+                pass
+        resolved_dirty = False
+        
         def get_model_path(model_name):
             """获取模型本地路径，如果已缓存则返回本地路径，否则返回模型名（触发下载）"""
+            nonlocal resolved_dirty
+            cached = resolved_paths.get(model_name)
+            if cached:
+                return os.path.join(models_dir, cached), True
             actual_name = MODEL_DIR_MAP.get(model_name, model_name.split('/')[-1])
-            local_path = os.path.join(MODELS_CACHE_DIR, 'models', 'iic', actual_name)
+            local_path = os.path.join(models_dir, actual_name)
             if os.path.exists(local_path):
+                resolved_paths[model_name] = actual_name
+                resolved_dirty = True
                 return local_path, True  # 返回本地路径
             return model_name, False  # 返回模型名触发下载
         
+        # 四个模型互不依赖，并行加载（首次运行时并行下载，缓存命中时并行反序列化权重）
+        loader = ThreadPoolExecutor(max_workers=4)
+        
         # 加载中文流式 ASR 模型
         model_name = "paraformer-zh-streaming"
         model_path, is_cached = get_model_path(model_name)
         print(f"  加载 ASR 模型: {model_name} {'[缓存]' if is_cached else '[下载]'}")
-        asr_model = AutoModel(
+        asr_future = loader.submit(
+            AutoModel,
             model=model_path,
             device=device,
             disable_update=True,
@@ -221,7 +374,8 @@ def init_models():
         model_name = "iic/punc_ct-transformer_zh-cn-common-vad_realtime-vocab272727"
         model_path, is_cached = get_model_path(model_name)
         print(f"  加载标点模型: punc_realtime {'[缓存]' if is_cached else '[下载]'}")
-        punc_realtime_model = AutoModel(
+        punc_future = loader.submit(
+            AutoModel,
             model=model_path,
             device=device,
             disable_update=True,
@@ -231,7 +385,8 @@ def init_models():
         model_name = "fsmn-vad"
         model_path, is_cached = get_model_path(model_name)
         print(f"  加载 VAD 模型: {model_name} {'[缓存]' if is_cached else '[下载]'}")
-        vad_model = AutoModel(
+        vad_future = loader.submit(
+            AutoModel,
             model=model_path,
             device=device,
             disable_update=True,
@@ -240,9 +395,13 @@ def init_models():
         # SenseVoice 复检模型（配置VAD）
         model_name = "iic/SenseVoiceSmall"
         model_path, is_cached = get_model_path(model_name)
-        vad_path, _ = get_model_path("fsmn-vad")  # VAD 模型路径
+        vad_path, vad_cached = get_model_path("fsmn-vad")  # VAD 模型路径
+        if not vad_cached:
+            # 与上面的 VAD 共用同一模型，需等其下载完成，避免并发下载同一目录
+            vad_future.result()
         print(f"  加载复检模型: SenseVoiceSmall {'[缓存]' if is_cached else '[下载]'}")
-        sensevoice_model = AutoModel(
+        sensevoice_future = loader.submit(
+            AutoModel,
             model=model_path,
             vad_model=vad_path,
             vad_kwargs={"max_single_segment_time": 120000},
@@ -255,13 +414,193 @@ def init_models():
             merge_length_s=15,  # 合并后的音频片段长度
         )
         
+        try:
+            asr_model = asr_future.result()
+            punc_realtime_model = punc_future.result()
+            vad_model = vad_future.result()
+            sensevoice_model = sensevoice_future.result()
+        finally:
+            loader.shutdown(wait=True)
+        
+        # 所有模型加载成功后再落盘路径缓存，避免记录无法加载的路径
+        if resolved_dirty:
+            try:
+                models_dir_mtime = os.stat(models_dir).st_mtime_ns
+                with open(resolved_cache_path, 'wb') as f:
+                    f.write(orjson.dumps({'mtime': models_dir_mtime, 'names': resolved_paths}))
+            except Exception as e:
+                print(f"  模型路径缓存写入失败: {e}")
+        
+        # CUDA 上为流式 ASR 与 VAD 分配独立的 stream：
+        # 不同会话的 VAD 与 ASR 推理在不同线程中进行，独立 stream 使其 GPU kernel 可以重叠执行
+        if device.startswith('cuda'):
+            import torch
+            model_streams = {
+                'asr': torch.cuda.Stream(),
+                'vad': torch.cuda.Stream(),
+            }
+        
+        # 预热：用静音 chunk 各跑一次模型，提前完成 CUDA 上下文初始化与 kernel 加载，
+        # 避免首个会话的首个 chunk、首次复检/文件转录出现明显卡顿
+        try:
+            warmup_start = time.time()
+            silence = np.zeros(9600, dtype=np.float32)  # 600ms
+            with asr_model_lock:
+                asr_model.generate(
+                    input=silence,
+                    cache={},
+                    is_final=False,
+                    chunk_size=[0, 10, 5],
+                    encoder_chunk_look_back=4,
+                    decoder_chunk_look_back=1,
+                )
+            with vad_model_lock:
+                vad_model.generate(
+                    input=silence[:3200],
+                    cache={},
+                    is_final=False,
+                    chunk_size=200,
+                )
+            with punc_model_lock:
+                punc_realtime_model.generate(input="预热", cache={})
+            # SenseVoice 复检/文件转录模型（1s 静音）
+            with sensevoice_model_lock, _inference_context():
+                sensevoice_model.generate(
+                    input=np.zeros(16000, dtype=np.float32),
+                    cache={},
+                )
+            print(f"  模型预热完成 ({time.time() - warmup_start:.1f}s)")
+        except Exception as e:
+            print(f"  模型预热失败（不影响使用）: {e}")
+        
         print("  所有模型加载完成")
         print("=" * 50 + "\n")
+    
+    models_ready.set()
+
+
+def _init_models_background():
+    """后台线程中加载模型：服务先启动监听，健康检查可立即响应并通过 ready 字段反映加载进度"""
+    global models_load_error
+    try:
+        init_models()
+    except Exception as e:
+        models_load_error = str(e) or type(e).__name__
+        print(f"  模型加载失败: {e}")
+        traceback.print_exc()
+        # 唤醒等待模型的请求，使其立即返回加载失败，而不是等到超时
+        models_ready.set()
 
 
 def allowed_file(filename):
     """检查文件格式是否支持"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in _ALLOWED_EXTENSIONS
+
+
+# 文件转录复用的解码缓冲区（避免每次请求重新分配并触发缺页）。
+# 数量与 _transcribe_slots 相同，随转录名额借还，而不是每个请求线程各持一份；
+# 超过上限的长音频仍按需分配，防止常驻过大的缓冲区
+DECODE_BUFFER_MAX_SAMPLES = 8 * 1024 * 1024  # 32MB float32
+_decode_buffer_pool = queue.SimpleQueue()
+for _ in range(TRANSCRIBE_MAX_CONCURRENCY):
+    _decode_buffer_pool.put([None])  # 每项为 [缓冲区]，首次使用时分配
+
+
+@contextlib.contextmanager
+def _borrow_decode_buffer():
+    """在持有 _transcribe_slots 名额期间借用一个解码缓冲区（名额与缓冲区一一对应，不会阻塞）"""
+    slot = _decode_buffer_pool.get()
+    try:
+        yield slot
+    finally:
+        _decode_buffer_pool.put(slot)
+
+
+def _decode_buffer(slot, frames, channels):
+    """返回借用缓冲区的 float32 视图（形状与 sf.read 输出一致），不适用时返回 None"""
+    n = frames * channels
+    if slot is None or n <= 0 or n > DECODE_BUFFER_MAX_SAMPLES:
+        return None
+    buf = slot[0]
+    if buf is None or len(buf) < n:
+        buf = np.empty(n, dtype=np.float32)
+        slot[0] = buf
+    view = buf[:n]
+    return view.reshape(frames, channels) if channels > 1 else view
+
+
+def _load_audio(audio_path, target_sr=16000, suffix='', decode_slot=None):
+    """读取音频为单声道 float32，并重采样到 target_sr
+    
+    优先使用 soundfile（libsndfile）解码，重采样交给 soxr（C/SIMD 实现）；
+    libsndfile 无法解码的格式（如 m4a/aac/wma/webm）回退到 librosa.load。
+    audio_path 也可以是内存中的文件对象，suffix 为其原始扩展名（回退解码时使用）。
+    decode_slot 为 _borrow_decode_buffer() 借到的缓冲区，为空时按需分配。
+    
+    Returns:
+        tuple: (audio_data, sample_rate)；audio_data 可能是借用缓冲区的视图，仅在归还前有效
+    """
+    try:
+        with sf.SoundFile(audio_path) as snd:
+            sr = snd.samplerate
+            audio_data = snd.read(dtype='float32', always_2d=False,
+                                  out=_decode_buffer(decode_slot, snd.frames, snd.channels))
+    except Exception:
+        if isinstance(audio_path, (str, os.PathLike)):
+            return librosa.load(audio_path, sr=target_sr, mono=True)
+        # librosa 对文件对象只会尝试 soundfile，到不了 audioread/ffmpeg：先落盘再按路径解码
+        audio_path.seek(0)
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=UPLOAD_TMP_DIR) as temp_audio:
+            shutil.copyfileobj(audio_path, temp_audio)
+            temp_audio.flush()
+            return librosa.load(temp_audio.name, sr=target_sr, mono=True)
+    
+    if audio_data.ndim > 1:
+        # 逐声道累加到一个 float32 数组后缩放：比沿长度仅为声道数的轴做 mean(axis=1) 快数倍
+        channels = audio_data.shape[1]
+        mono = audio_data[:, 0].copy()
+        for ch in range(1, channels):
+            mono += audio_data[:, ch]
+        mono *= np.float32(1.0 / channels)
+        audio_data = mono
+    if sr != target_sr:
+        audio_data = soxr.resample(audio_data, sr, target_sr, quality='HQ')
+        sr = target_sr
+    return audio_data, sr
+
+
+def _write_wav_pcm16(path, audio_data, sample_rate=16000):
+    """将单声道 float32 音频写为 16-bit PCM WAV
+    
+    格式固定（单声道、PCM_16），直接用 wave 写入原始 PCM，
+    省去 soundfile 每次推断格式/子类型的开销；输出与 sf.write 默认结果一致。
+    按 1 秒一块转换写入，长录音也只占用一块大小的临时内存。
+    """
+    block = sample_rate
+    pcm = np.empty(block, dtype=np.float32)
+    pcm16 = np.empty(block, dtype='<i2')
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.setnframes(len(audio_data))
+        for start in range(0, len(audio_data), block):
+            n = min(block, len(audio_data) - start)
+            np.multiply(audio_data[start:start + n], 32767.0, out=pcm[:n], dtype=np.float32)
+            np.clip(pcm[:n], -32768.0, 32767.0, out=pcm[:n])
+            np.rint(pcm[:n], out=pcm[:n])
+            pcm16[:n] = pcm[:n]
+            wf.writeframesraw(pcm16[:n])
+
+
+# SenseVoice 输出中需要移除的虚假文本（不区分大小写，模块加载时预编译）。
+# 必须按顺序逐个替换：前一个词被删除后会产生新的词边界（如 'OkayUh'），合并为单个模式结果会不同
+_FAKE_TEXT_PATTERNS = tuple(
+    re.compile(rf'\b{word}\.?\s*', re.IGNORECASE)
+    for word in ('Yeah', 'Okay', 'OK', 'Oh', 'Hmm', 'Uh', 'Um', 'Ah', 'Eh', 'Well', 'Yes', 'W')
+)
+_WHITESPACE_RE = re.compile(r'\s+')
 
 
 def _clean_sensevoice_text(text):
@@ -272,38 +611,53 @@ def _clean_sensevoice_text(text):
     if not text:
         return text
     
-    # 需要移除的虚假文本模式（不区分大小写）
-    fake_patterns = [
-        r'\bYeah\.?\s*',
-        r'\bOkay\.?\s*',
-        r'\bOK\.?\s*',
-        r'\bOh\.?\s*',
-        r'\bHmm\.?\s*',
-        r'\bUh\.?\s*',
-        r'\bUm\.?\s*',
-        r'\bAh\.?\s*',
-        r'\bEh\.?\s*',
-        r'\bWell\.?\s*',
-        r'\bYes\.?\s*',
-        r'\bW\.?\s*',
-    ]
-    
     cleaned = text
-    for pattern in fake_patterns:
-        cleaned = re.sub(pattern, '', cleaned, flags=re.IGNORECASE)
+    for pattern in _FAKE_TEXT_PATTERNS:
+        cleaned = pattern.sub('', cleaned)
     
     # 清理多余空格
-    cleaned = re.sub(r'\s+', ' ', cleaned).strip()
+    cleaned = _WHITESPACE_RE.sub(' ', cleaned).strip()
     
     return cleaned
 
 
-def _run_sensevoice(audio_path):
-    """使用SenseVoice进行完整音频识别（文件路径）"""
+def _inference_context():
+    """SenseVoice 推理上下文
+    
+    - 启用 torch.inference_mode()，跳过 autograd 记录与版本计数
+    - CUDA 上启用自动混合精度（支持 bf16 时用 bf16，否则 fp16）
+    """
+    stack = contextlib.ExitStack()
+    try:
+        import torch
+    except ImportError:
+        return stack
+    
+    stack.enter_context(torch.inference_mode())
+    if model_device.startswith('cuda'):
+        dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        stack.enter_context(torch.autocast('cuda', dtype=dtype))
+    return stack
+
+
+def _model_stream(name):
+    """返回在模型专属 CUDA stream 上执行的上下文（非 CUDA 设备时为空操作）
+    
+    FunASR 的 generate 会把结果拷回 CPU，返回时该 stream 上的计算已完成，无需额外同步。
+    """
+    stream = model_streams.get(name)
+    if stream is None:
+        return contextlib.nullcontext()
+    import torch
+    return torch.cuda.stream(stream)
+
+
+def _run_sensevoice(audio):
+    """使用SenseVoice进行完整音频识别（文件路径或 16kHz float32 数组）"""
     try:
-        with sensevoice_model_lock:
+        with sensevoice_model_lock, _inference_context():
             result = sensevoice_model.generate(
-                input=audio_path,
+                input=audio,
                 cache={},
             )
         
@@ -323,13 +677,15 @@ def _run_sensevoice(audio_path):
         raise Exception(f"SenseVoice识别失败: {str(e)}")
 
 
-def _run_sensevoice_with_timestamps(audio_path, progress_callback=None, sid=None):
+def _run_sensevoice_with_timestamps(audio, progress_callback=None, sid=None, segment_callback=None, offset_ms=0):
     """使用独立VAD模型获取语音段时间戳，再用SenseVoice识别每段（优化版）
     
     Args:
-        audio_path: 音频文件路径
+        audio: 音频文件路径，或 16kHz 单声道 float32 数组
         progress_callback: 进度回调函数，接收 (current, total)
         sid: 会话 ID（用于日志前缀）
+        segment_callback: 分段结果回调函数，每识别出一段即调用，接收 {text, start_ms, end_ms}
+        offset_ms: 加到所有时间戳上的偏移（audio 为完整录音中的一段时使用）
     
     Returns:
         tuple: (full_text, segments)
@@ -342,7 +698,7 @@ def _run_sensevoice_with_timestamps(audio_path, progress_callback=None, sid=None
         
         with vad_model_lock:
             vad_result = vad_model.generate(
-                input=audio_path,
+                input=audio,
                 cache={},
             )
         
@@ -387,13 +743,20 @@ def _run_sensevoice_with_timestamps(audio_path, progress_callback=None, sid=None
         # 如果VAD没有检测到分段
         if not vad_segments:
             _log('SenseVoice: VAD 无分段，使用整体识别', sid, level='WARN')
-            text = _run_sensevoice(audio_path)
+            text = _run_sensevoice(audio)
+            segments = [{'text': text, 'start_ms': offset_ms, 'end_ms': offset_ms}] if text else []
+            if segment_callback:
+                for segment in segments:
+                    segment_callback(segment)
             if progress_callback:
                 progress_callback(100, 100)
-            return text, [{'text': text, 'start_ms': 0, 'end_ms': 0}] if text else (text, [])
+            return text, segments
         
-        # 读取音频
-        audio_data, sr = librosa.load(audio_path, sr=16000, mono=True)
+        # 读取音频（已是内存数组时直接使用）
+        if isinstance(audio, np.ndarray):
+            audio_data, sr = audio, 16000
+        else:
+            audio_data, sr = _load_audio(audio)
         
         audio_segments = []
         for start_ms, end_ms in vad_segments:
@@ -404,39 +767,44 @@ def _run_sensevoice_with_timestamps(audio_path, progress_callback=None, sid=None
             if len(segment_audio) >= sr * 1:
                 audio_segments.append({
                     'audio': segment_audio,
-                    'start_ms': int(start_ms),
-                    'end_ms': int(end_ms)
+                    'start_ms': int(start_ms) + offset_ms,
+                    'end_ms': int(end_ms) + offset_ms
                 })
         
         segments = []
         total_segs = len(audio_segments)
         _log(f'SenseVoice: 识别 {total_segs} 段...', sid)
         
-        # 批量处理
-        with sensevoice_model_lock:
-            for i, seg_info in enumerate(audio_segments):
+        # 逐段识别：sensevoice_model 带 vad_model，列表输入也会在 FunASR 内部逐条经过 VAD 再解码，
+        # 合并提交不会组 batch，且识别为空的片段不返回结果、无法按位置与输入对应。
+        # 仅 generate 持有模型锁；文本后处理是纯 Python 计算，放在锁外，减少并发会话的锁等待
+        for i, seg_info in enumerate(audio_segments):
+            with sensevoice_model_lock, _inference_context():
                 result = sensevoice_model.generate(
                     input=seg_info['audio'],
                     cache={},
                 )
+            
+            if result and len(result) > 0:
+                raw_text = result[0].get("text", "")
+                clean_text = rich_transcription_postprocess(raw_text)
+                clean_text = emoji.replace_emoji(clean_text, replace='')
+                clean_text = _clean_sensevoice_text(clean_text)
                 
-                if result and len(result) > 0:
-                    raw_text = result[0].get("text", "")
-                    clean_text = rich_transcription_postprocess(raw_text)
-                    clean_text = emoji.replace_emoji(clean_text, replace='')
-                    clean_text = _clean_sensevoice_text(clean_text)
-                    
-                    if clean_text.strip():
-                        segments.append({
-                            'text': clean_text,
-                            'start_ms': seg_info['start_ms'],
-                            'end_ms': seg_info['end_ms']
-                        })
-                
-                # 更新进度：从 20% 到 95%
-                if progress_callback:
-                    current_progress = 20 + int((i + 1) / total_segs * 75)
-                    progress_callback(current_progress, 100)
+                if clean_text.strip():
+                    segment = {
+                        'text': clean_text,
+                        'start_ms': seg_info['start_ms'],
+                        'end_ms': seg_info['end_ms']
+                    }
+                    segments.append(segment)
+                    if segment_callback:
+                        segment_callback(segment)
+            
+            # 更新进度：从 20% 到 95%
+            if progress_callback:
+                current_progress = 20 + int((i + 1) / total_segs * 75)
+                progress_callback(current_progress, 100)
         
         full_text = ''.join([seg['text'] for seg in segments])
         
@@ -451,6 +819,83 @@ def _run_sensevoice_with_timestamps(audio_path, progress_callback=None, sid=None
 
 # ==================== 实时录音处理类 ====================
 
+# int16 PCM 转 float32 的缩放系数
+_PCM16_SCALE = np.float32(1.0 / 32768.0)
+
+
+class _AudioBuffer:
+    """预分配的 float32 音频缓冲区（容量不足时倍增扩容）
+    
+    一次会话的音频只写入一次：ASR、VAD 各自维护读指针，通过 view() 取零拷贝视图，
+    完整录音即 view()。
+    
+    扩容总是分配新数组而不覆写旧数组，因此已交给模型的视图（可能被流式缓存引用）始终有效。
+    """
+    
+    def __init__(self, capacity=16000 * 60):
+        self._data = np.empty(capacity, dtype=np.float32)
+        self._size = 0
+    
+    def __len__(self):
+        """已写入的采样点数"""
+        return self._size
+    
+    def _reserve(self, n):
+        """确保还能写入 n 个采样点"""
+        if self._size + n <= len(self._data):
+            return
+        new_data = np.empty(max(len(self._data), self._size + n) * 2, dtype=np.float32)
+        new_data[:self._size] = self._data[:self._size]
+        self._data = new_data
+    
+    def extend_pcm16(self, pcm):
+        """追加 int16 PCM 采样点
+        
+        int16 -> float32 的转换与缩放由一次 np.multiply 完成，直接写入缓冲区，不产生中间数组。
+        """
+        n = len(pcm)
+        self._reserve(n)
+        np.multiply(pcm, _PCM16_SCALE, out=self._data[self._size:self._size + n], dtype=np.float32)
+        self._size += n
+    
+    def view(self, start=0, end=None):
+        """返回 [start, end) 区间采样点的视图（end 为空或越界时截到已写入末尾）"""
+        end = self._size if end is None else min(end, self._size)
+        return self._data[start:end]
+
+
+class _SegmentList:
+    """实时粗略时间戳片段（结构数组：起止时间存于预分配 int64 数组，文本单独成表）
+    
+    会话期间只追加不读取，避免每个片段常驻一个 dict；需要输出时再由 to_dicts() 组装。
+    """
+    
+    def __init__(self, capacity=256):
+        self._starts = np.empty(capacity, dtype=np.int64)
+        self._ends = np.empty(capacity, dtype=np.int64)
+        self._texts = []
+    
+    def __len__(self):
+        return len(self._texts)
+    
+    def append(self, text, start_ms, end_ms):
+        n = len(self._texts)
+        if n == len(self._starts):
+            self._starts = np.resize(self._starts, n * 2)
+            self._ends = np.resize(self._ends, n * 2)
+        self._starts[n] = start_ms
+        self._ends[n] = end_ms
+        self._texts.append(text)
+    
+    def to_dicts(self):
+        """组装为 [{text, start_ms, end_ms}, ...]"""
+        n = len(self._texts)
+        return [
+            {'text': text, 'start_ms': start_ms, 'end_ms': end_ms}
+            for text, start_ms, end_ms in zip(self._texts, self._starts[:n].tolist(), self._ends[:n].tolist())
+        ]
+
+
 class RealtimeASR:
     """实时语音识别处理器
     
@@ -467,34 +912,58 @@ class RealtimeASR:
         self.is_finalizing = False
         self.start_time = time.time()  # 录音开始时间
         
+        # 绑定模型句柄，避免流式热路径上每帧都查找模块全局变量
+        self._asr = asr_model
+        self._vad = vad_model
+        self._punc = punc_realtime_model
+        
         # ASR 相关配置
-        self.audio_buffer = []  # ASR 音频缓冲区
+        self.asr_read_pos = 0  # ASR 在 full_audio 中的读指针（采样点）
         self.asr_cache = {}  # 流式 ASR 识别缓存
         self.chunk_size = [0, 10, 5]  # [0, 10, 5] 表示 600ms 实时出字
         self.asr_chunk_stride = self.chunk_size[1] * 960  # 600ms = 9600 采样点
+        # 流式识别的固定参数，预先打包，每个 chunk 调用时直接展开
+        self._asr_stream_kw = dict(
+            is_final=False,
+            chunk_size=self.chunk_size,
+            encoder_chunk_look_back=4,
+            decoder_chunk_look_back=1,
+        )
+        self._silent_chunks = 0  # 连续静音 chunk 数（超过 hangover 后跳过 ASR）
         
         # VAD 相关配置
-        self.vad_buffer = []  # VAD 音频缓冲区
+        self.vad_read_pos = 0  # VAD 在 full_audio 中的读指针（采样点）
         self.vad_cache = {}  # VAD 检测缓存
         self.vad_chunk_size = 200  # VAD 检测粒度 200ms
         self.vad_chunk_stride = int(self.vad_chunk_size * self.sample_rate / 1000)  # 3200 采样点
         self.is_speech_active = False  # 当前是否检测到语音
         self.speech_start_time = 0  # 语音开始时间（毫秒）
         self.total_audio_ms = 0  # 已处理的音频总时长（毫秒）
+        self._dirty_samples = 0  # 上次处理后新到达的采样点数（不足一个 VAD chunk 时跳过处理）
         
         # 标点相关配置
         self.punc_cache = {}  # 实时标点缓存
         self.all_text = ""  # 累积所有识别文本（无标点）
         self.text_with_punc = ""  # 已添加标点的文本
         self.pending_text = ""  # 等待标点的文本
+        self.full_text = ""  # text_with_punc + pending_text，随二者增量维护，避免每次结果都重新拼接
         self.sentence_buffer = ""  # 当前句子缓冲区（VAD 分句用）
+        self._last_punc_ms = 0  # 上次标点处理时的音频时间（毫秒）
+        self._punc_on_vad_end = False  # VAD 检测到语音结束后置位，下一个 ASR chunk 对待标点文本断句
+        self._punc_future = None  # 后台执行中的标点任务
+        self._punc_inflight = None  # 标点任务对应的 (原始文本, start_ms, end_ms)
         
-        # 完整录音缓存（用于 SenseVoice 最终识别）
-        self.full_audio = []
+        # 录音过程中提前完成的 SenseVoice 复检
+        self._sv_checkpoint = 0  # 已复检音频的结束位置（采样点）
+        self._sv_segments = []  # 已复检的分段结果 [{text, start_ms, end_ms}, ...]
+        self._sv_future = None  # 后台执行中的复检任务
+        
+        # 完整录音缓存（ASR、VAD 通过各自读指针共享，同时用于 SenseVoice 最终识别）
+        self.full_audio = _AudioBuffer()
         
         # 实时时间戳跟踪
         self.asr_processed_ms = 0  # ASR 已处理的音频时长（毫秒）
-        self.segments = []  # 带时间戳的文本片段列表 [{text, start_ms, end_ms}, ...]
+        self.segments = _SegmentList()  # 带时间戳的文本片段（输出时组装为 [{text, start_ms, end_ms}, ...]）
         self.current_segment_start = 0  # 当前片段起始时间
         
     def add_audio(self, audio_data):
@@ -507,13 +976,12 @@ class RealtimeASR:
             if len(audio_data) == 0:
                 return
             
-            # 将字节数据转换为 float32 numpy 数组
-            audio_np = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
-            self.audio_buffer.extend(audio_np)
-            self.vad_buffer.extend(audio_np)
-            self.full_audio.extend(audio_np)  # 保存完整音频用于 SenseVoice
+            # 将字节数据转换为 float32，直接写入共享的完整录音缓冲区
+            pcm = np.frombuffer(audio_data, dtype=np.int16)
+            self.full_audio.extend_pcm16(pcm)
+            self._dirty_samples += len(pcm)
         except Exception as e:
-            _log(f'音频数据处理错误: {str(e)}', self.session_id, level='ERROR')
+            _log_throttled('add_audio', f'音频数据处理错误: {str(e)}', self.session_id, level='ERROR')
     
     def _process_vad(self):
         """处理 VAD 语音端点检测
@@ -523,41 +991,41 @@ class RealtimeASR:
         - {'type': 'start', 'time': ms}: 检测到语音开始
         - {'type': 'end', 'time': ms}: 检测到语音结束
         """
-        if len(self.vad_buffer) < self.vad_chunk_stride:
+        if len(self.full_audio) - self.vad_read_pos < self.vad_chunk_stride:
             return None
         
         try:
             # 取出 VAD chunk
-            vad_chunk = np.array(self.vad_buffer[:self.vad_chunk_stride], dtype=np.float32)
+            vad_chunk = self.full_audio.view(self.vad_read_pos, self.vad_read_pos + self.vad_chunk_stride)
             
             # VAD 检测
             is_final = False
             try:
-                with vad_model_lock:
-                    vad_result = vad_model.generate(
+                with vad_model_lock, _model_stream('vad'):
+                    vad_result = self._vad.generate(
                         input=vad_chunk,
                         cache=self.vad_cache,
                         is_final=is_final,
                         chunk_size=self.vad_chunk_size
                     )
             except Exception as e:
-                _log(f'VAD 检测错误: {str(e)}', self.session_id, level='WARN')
+                _log_throttled('vad', f'VAD 检测错误: {str(e)}', self.session_id, level='WARN')
                 self.vad_cache = {}
                 try:
-                    with vad_model_lock:
-                        vad_result = vad_model.generate(
+                    with vad_model_lock, _model_stream('vad'):
+                        vad_result = self._vad.generate(
                             input=vad_chunk,
                             cache=self.vad_cache,
                             is_final=is_final,
                             chunk_size=self.vad_chunk_size
                         )
                 except Exception as e2:
-                    _log(f'VAD 重试失败: {str(e2)}', self.session_id, level='WARN')
-                    self.vad_buffer = self.vad_buffer[self.vad_chunk_stride:]
+                    _log_throttled('vad_retry', f'VAD 重试失败: {str(e2)}', self.session_id, level='WARN')
+                    self.vad_read_pos += self.vad_chunk_stride
                     self.total_audio_ms += self.vad_chunk_size
                     return None
 
-            self.vad_buffer = self.vad_buffer[self.vad_chunk_stride:]
+            self.vad_read_pos += self.vad_chunk_stride
             
             self.total_audio_ms += self.vad_chunk_size
             
@@ -585,16 +1053,18 @@ class RealtimeASR:
                             # 检测到语音结束
                             if self.is_speech_active:
                                 self.is_speech_active = False
+                                self._punc_on_vad_end = True
                                 return {'type': 'end', 'time': end}
                         
                         elif beg >= 0 and end >= 0:
                             # 完整语音段（开始和结束）
+                            self._punc_on_vad_end = True
                             return {'type': 'segment', 'start': beg, 'end': end}
             
             return None
             
         except Exception as e:
-            _log(f'VAD 检测异常: {str(e)}', self.session_id, level='WARN')
+            _log_throttled('vad_exc', f'VAD 检测异常: {str(e)}', self.session_id, level='WARN')
             return None
     
     def _apply_realtime_punc(self, text):
@@ -602,12 +1072,12 @@ class RealtimeASR:
         
         实时标点模型支持流式处理，会根据上下文智能添加标点
         """
-        if not text or not punc_realtime_model:
+        if not text or not self._punc:
             return text
         
         try:
             with punc_model_lock:
-                punc_result = punc_realtime_model.generate(
+                punc_result = self._punc.generate(
                     input=text,
                     cache=self.punc_cache
                 )
@@ -617,6 +1087,42 @@ class RealtimeASR:
             _log(f'实时标点恢复失败: {str(e)}', self.session_id)
         
         return text
+    
+    def _submit_punc(self, end_ms):
+        """将 pending_text 提交给后台标点线程，不阻塞音频处理
+        
+        结果由后续的 _collect_punc 取回；同一会话同时最多一个任务，保证标点缓存按顺序更新。
+        """
+        self._punc_inflight = (self.pending_text, self.current_segment_start, end_ms)
+        self._punc_future = _punc_executor.submit(self._apply_realtime_punc, self.pending_text)
+        
+        # 更新下一个片段的起始时间（full_text 仍包含提交中的原始文本，结果取回后替换）
+        self.current_segment_start = end_ms
+        self.pending_text = ""
+        self._last_punc_ms = end_ms
+    
+    def _collect_punc(self, wait=False):
+        """取回后台标点结果并提交为片段
+        
+        Args:
+            wait: 为 True 时等待任务完成；否则任务未完成直接返回 None
+        
+        Returns:
+            dict | None: 新提交的片段 {text, start_ms, end_ms}
+        """
+        future = self._punc_future
+        if future is None or (not wait and not future.done()):
+            return None
+        
+        text, start_ms, end_ms = self._punc_inflight
+        punc_text = future.result()
+        self._punc_future = None
+        self._punc_inflight = None
+        
+        self.text_with_punc += punc_text
+        self.full_text = self.text_with_punc + self.pending_text
+        self.segments.append(punc_text, start_ms, end_ms)
+        return {'text': punc_text, 'start_ms': start_ms, 'end_ms': end_ms}
         
     def process_audio(self):
         """处理缓冲区中的音频（流式）
@@ -627,17 +1133,25 @@ class RealtimeASR:
         3. 使用实时标点模型添加标点
         4. 当 VAD 检测到语音结束时，强制输出当前句子
         """
+        # 新到达的音频不足一个 VAD chunk（200ms）时，任何模型输出都不会变化，直接跳过
+        # （浏览器常以 20ms 左右的小包发送，避免每个小包都走一遍处理流程）
+        if self._dirty_samples < self.vad_chunk_stride:
+            return None
+        # 每次只推进一个 VAD chunk，余量留到下次，保证 VAD 进度与到达的音频同步
+        self._dirty_samples -= self.vad_chunk_stride
+        
         # 先处理 VAD
         vad_event = self._process_vad()
+        self._maybe_start_sensevoice_recheck(vad_event)
         
         # 检查是否有足够的音频数据进行 ASR（600ms）
-        if len(self.audio_buffer) < self.asr_chunk_stride:
+        if len(self.full_audio) - self.asr_read_pos < self.asr_chunk_stride:
             # 如果有 VAD 事件但没有足够音频，返回 VAD 状态
             if vad_event:
                 return {
                     "text": "",
                     "punc_text": "",
-                    "full_text": self.text_with_punc + self.pending_text,
+                    "full_text": self.full_text,
                     "is_final": False,
                     "vad_event": vad_event
                 }
@@ -645,39 +1159,34 @@ class RealtimeASR:
         
         try:
             # 取出一个 chunk 的音频
-            speech_chunk = np.array(self.audio_buffer[:self.asr_chunk_stride], dtype=np.float32)
+            speech_chunk = self.full_audio.view(self.asr_read_pos, self.asr_read_pos + self.asr_chunk_stride)
+            
+            # 静音门限：VAD 非语音且能量很低时不调用模型，只推进读指针和时间
+            if not self.is_speech_active and np.dot(speech_chunk, speech_chunk) < ASR_SILENCE_ENERGY * len(speech_chunk):
+                self._silent_chunks += 1
+            else:
+                self._silent_chunks = 0
             
             # 流式 ASR 识别
             try:
-                with asr_model_lock:
-                    asr_result = asr_model.generate(
-                        input=speech_chunk,
-                        cache=self.asr_cache,
-                        is_final=False,
-                        chunk_size=self.chunk_size,
-                        encoder_chunk_look_back=4,
-                        decoder_chunk_look_back=1,
-                    )
+                if self._silent_chunks > ASR_SILENCE_HANGOVER_CHUNKS:
+                    asr_result = None
+                else:
+                    with asr_model_lock, _model_stream('asr'):
+                        asr_result = self._asr.generate(input=speech_chunk, cache=self.asr_cache, **self._asr_stream_kw)
             except Exception as e:
-                _log(f'流式识别错误: {str(e)}', self.session_id, level='ERROR')
+                _log_throttled('asr', f'流式识别错误: {str(e)}', self.session_id, level='ERROR')
                 self.asr_cache = {}
                 try:
-                    with asr_model_lock:
-                        asr_result = asr_model.generate(
-                            input=speech_chunk,
-                            cache=self.asr_cache,
-                            is_final=False,
-                            chunk_size=self.chunk_size,
-                            encoder_chunk_look_back=4,
-                            decoder_chunk_look_back=1,
-                        )
+                    with asr_model_lock, _model_stream('asr'):
+                        asr_result = self._asr.generate(input=speech_chunk, cache=self.asr_cache, **self._asr_stream_kw)
                 except Exception as e2:
-                    _log(f'流式识别重试失败: {str(e2)}', self.session_id, level='ERROR')
-                    self.audio_buffer = self.audio_buffer[self.asr_chunk_stride:]
+                    _log_throttled('asr_retry', f'流式识别重试失败: {str(e2)}', self.session_id, level='ERROR')
+                    self.asr_read_pos += self.asr_chunk_stride
                     self.asr_processed_ms += 600
                     return None
 
-            self.audio_buffer = self.audio_buffer[self.asr_chunk_stride:]
+            self.asr_read_pos += self.asr_chunk_stride
             
             # 记录当前 chunk 的时间范围
             chunk_start_ms = self.asr_processed_ms
@@ -686,7 +1195,14 @@ class RealtimeASR:
             
             text = ""
             punc_text = ""
-            current_segment = None
+            
+            # 取回已完成的后台标点结果（实时粗略时间戳片段）
+            current_segment = self._collect_punc()
+            if current_segment:
+                punc_text = current_segment['text']
+            
+            # 取回录音过程中提前完成的 SenseVoice 复检分段
+            sensevoice_segments = self._collect_sensevoice_recheck()
             
             if asr_result and len(asr_result) > 0:
                 text = asr_result[0].get("text", "")
@@ -695,57 +1211,185 @@ class RealtimeASR:
                     # 累积原始文本
                     self.all_text += text
                     self.pending_text += text
+                    self.full_text += text
                     self.sentence_buffer += text
-                    
-                    # 检查是否需要进行标点处理
-                    # 条件：VAD 检测到语音结束，或累积文本超过阈值
-                    should_apply_punc = False
-                    
-                    if vad_event and vad_event.get('type') == 'end':
-                        # VAD 检测到语音结束，强制处理当前句子
-                        should_apply_punc = True
-                    elif len(self.pending_text) >= 20:
-                        # 累积超过 20 字符时处理
-                        should_apply_punc = True
-                    
-                    if should_apply_punc and self.pending_text:
-                        # 使用实时标点模型
-                        punc_text = self._apply_realtime_punc(self.pending_text)
-                        self.text_with_punc += punc_text
-                        
-                        # 记录带时间戳的片段（实时粗略时间戳）
-                        current_segment = {
-                            'text': punc_text,
-                            'start_ms': self.current_segment_start,
-                            'end_ms': chunk_end_ms
-                        }
-                        self.segments.append(current_segment)
-                        
-                        # 更新下一个片段的起始时间
-                        self.current_segment_start = chunk_end_ms
-                        self.pending_text = ""
-                        
-                        # 如果是 VAD 结束事件，重置句子缓冲区
-                        if vad_event and vad_event.get('type') == 'end':
-                            self.sentence_buffer = ""
             
-            return {
+            # 检查是否需要进行标点处理（与本 chunk 是否有新文字无关：结束语音的 chunk 通常为空或被静音门限跳过）
+            # 条件：VAD 检测到语音结束（可能发生在非 ASR 的 VAD 步上，由 _punc_on_vad_end 记住），
+            # 或距上次标点处理已超过兜底间隔（长句不断句时）
+            # 上一次标点任务仍在执行时跳过，留待下一个 chunk 再处理
+            if self._punc_future is None:
+                if self._punc_on_vad_end:
+                    self._punc_on_vad_end = False
+                    self.sentence_buffer = ""
+                    if self.pending_text:
+                        self._submit_punc(chunk_end_ms)
+                elif self.pending_text and chunk_end_ms - self._last_punc_ms >= PUNC_FALLBACK_INTERVAL_MS:
+                    self._submit_punc(chunk_end_ms)
+            
+            result = {
                 "text": text,
                 "punc_text": punc_text,
-                "full_text": self.text_with_punc + self.pending_text,
+                "full_text": self.full_text,
                 "is_final": False,
                 "vad_event": vad_event,
                 "is_speech_active": self.is_speech_active,
                 "segment": current_segment,  # 当前片段的时间戳信息
                 "current_time_ms": chunk_end_ms  # 当前音频时间
             }
+            if sensevoice_segments:
+                result["sensevoice_segments"] = sensevoice_segments  # 提前复检完成的 SenseVoice 分段
+            return result
             
         except Exception as e:
-            _log(f'流式识别异常: {str(e)}', self.session_id, level='ERROR')
+            _log_throttled('asr_exc', f'流式识别异常: {str(e)}', self.session_id, level='ERROR')
             return None
     
-    def finalize(self, progress_callback=None):
-        """完成识别，生成最终结果"""
+    def _flush_paraformer(self):
+        """处理最后剩余的音频并补全标点，返回 Paraformer 最终文本"""
+        paraformer_start = time.time()
+        
+        # 等待仍在执行的后台标点任务，保证文本顺序
+        self._collect_punc(wait=True)
+        
+        # 处理最后剩余的音频
+        if len(self.full_audio) - self.asr_read_pos >= 4800:  # 至少 300ms
+            speech_chunk = self.full_audio.view(self.asr_read_pos)
+            with asr_model_lock, _model_stream('asr'):
+                asr_result = self._asr.generate(
+                    input=speech_chunk,
+                    cache=self.asr_cache,
+                    is_final=True,
+                    chunk_size=self.chunk_size,
+                )
+            
+            if asr_result and len(asr_result) > 0:
+                text = asr_result[0].get("text", "")
+                if text:
+                    self.all_text += text
+                    self.pending_text += text
+                    self.full_text += text
+        
+        # 对剩余待处理文本使用实时标点模型
+        if self.pending_text:
+            punc_text = self._apply_realtime_punc(self.pending_text)
+            self.text_with_punc += punc_text
+            self.pending_text = ""
+            self.full_text = self.text_with_punc
+        
+        paraformer_text = self.text_with_punc
+        paraformer_time = time.time() - paraformer_start
+        _log(f'Paraformer: {len(paraformer_text)}字 ({paraformer_time:.1f}s)', self.session_id)
+        return paraformer_text
+    
+    def _write_backup_audio(self):
+        """将完整录音写入备份目录（供前端丢失数据时下载）
+        
+        Returns:
+            str | None: 备份音频 ID，写入失败或无音频时为 None
+        """
+        if len(self.full_audio) == 0:
+            return None
+        
+        try:
+            audio_array = self.full_audio.view()
+            backup_audio_id = f"{self.session_id}_{int(time.time())}"
+            backup_path = os.path.join(AUDIO_BACKUP_DIR, f"{backup_audio_id}.wav")
+            _write_wav_pcm16(backup_path, audio_array, self.sample_rate)
+            
+            audio_duration_s = len(audio_array) / self.sample_rate
+            _log(f'音频备份: {_short_sid(backup_audio_id)}.wav ({audio_duration_s:.1f}s)', self.session_id)
+            return backup_audio_id
+        except Exception as e:
+            _log(f'音频备份失败: {str(e)}', self.session_id, level='ERROR')
+            return None
+    
+    def _maybe_start_sensevoice_recheck(self, vad_event):
+        """在语音结束处对上次复检位置之后累积的音频提前运行 SenseVoice（后台执行，不阻塞实时识别）"""
+        if self._sv_future is not None or not vad_event or vad_event.get('type') != 'end':
+            return
+        end = min(int(vad_event['time'] * self.sample_rate / 1000), len(self.full_audio))
+        if end - self._sv_checkpoint < SENSEVOICE_RECHECK_MIN_S * self.sample_rate:
+            return
+        self._sv_future = _sensevoice_recheck_executor.submit(self._recheck_range, self._sv_checkpoint, end)
+    
+    def _recheck_range(self, start, end):
+        """对 [start, end) 区间的音频运行 VAD 分段 + SenseVoice，返回 (end, segments)"""
+        _, segments = _run_sensevoice_with_timestamps(
+            self.full_audio.view(start, end),
+            sid=self.session_id,
+            offset_ms=start * 1000 // self.sample_rate,
+        )
+        return end, segments
+    
+    def _collect_sensevoice_recheck(self, wait=False):
+        """取回提前复检的结果并推进复检位置
+        
+        识别结果为空（静音或识别失败）时不推进，该区间留给停止录音后的复检处理。
+        
+        Returns:
+            list: 新完成的分段
+        """
+        future = self._sv_future
+        if future is None or (not wait and not future.done()):
+            return []
+        self._sv_future = None
+        try:
+            end, segments = future.result()
+        except Exception as e:
+            _log(f'SenseVoice 提前复检失败: {str(e)}', self.session_id, level='WARN')
+            return []
+        if segments:
+            self._sv_segments.extend(segments)
+            self._sv_checkpoint = end
+            _log(f'SenseVoice 提前复检: {len(segments)}段 (至 {end / self.sample_rate:.0f}s)', self.session_id)
+        return segments
+    
+    def _run_final_sensevoice(self, progress_callback=None, segment_callback=None):
+        """使用 VAD分段 + SenseVoice 对完整录音复检（直接使用内存中的音频，不依赖备份文件）
+        
+        录音过程中已提前复检的部分直接复用，只对剩余音频运行 SenseVoice。
+        
+        Returns:
+            tuple: (sensevoice_text, timestamps)
+        """
+        self._collect_sensevoice_recheck(wait=True)
+        timestamps = list(self._sv_segments)
+        if segment_callback:
+            for segment in timestamps:
+                segment_callback(segment)
+        
+        start = self._sv_checkpoint
+        if len(self.full_audio) > start:
+            sensevoice_start = time.time()
+            _log(f'SenseVoice 复检开始（已提前复检 {start / self.sample_rate:.0f}s）...', self.session_id)
+            try:
+                _, remaining = _run_sensevoice_with_timestamps(
+                    self.full_audio.view(start),
+                    progress_callback=progress_callback,
+                    sid=self.session_id,
+                    segment_callback=segment_callback,
+                    offset_ms=start * 1000 // self.sample_rate,
+                )
+                timestamps.extend(remaining)
+                
+                sensevoice_time = time.time() - sensevoice_start
+                _log(f'SenseVoice: {len(timestamps)}段 ({sensevoice_time:.1f}s)', self.session_id)
+            except Exception as e:
+                _log(f'SenseVoice 复检失败: {str(e)}', self.session_id, level='ERROR')
+        
+        sensevoice_text = ''.join(seg['text'] for seg in timestamps)
+        return sensevoice_text, timestamps
+    
+    def finalize(self, progress_callback=None, segment_callback=None):
+        """完成识别，生成最终结果
+        
+        segment_callback 用于在 SenseVoice 复检过程中逐段推送已识别的文本，
+        前端无需等待全部处理完成即可显示结果。
+        
+        Paraformer 尾部解码 + 标点、SenseVoice 复检、录音备份写盘三者互不依赖
+        （两类模型使用不同的模型锁），因此并行执行，收尾耗时与磁盘 IO 被 SenseVoice 复检覆盖。
+        """
         try:
             finalize_start = time.time()
             recording_duration = finalize_start - self.start_time
@@ -756,62 +1400,13 @@ class RealtimeASR:
             if progress_callback:
                 progress_callback(2, 100) # 开始处理
             
-            # 处理最后剩余的音频
-            if len(self.audio_buffer) >= 4800:  # 至少 300ms
-                speech_chunk = np.array(self.audio_buffer, dtype=np.float32)
-                with asr_model_lock:
-                    asr_result = asr_model.generate(
-                        input=speech_chunk,
-                        cache=self.asr_cache,
-                        is_final=True,
-                        chunk_size=self.chunk_size,
-                    )
-                
-                if asr_result and len(asr_result) > 0:
-                    text = asr_result[0].get("text", "")
-                    if text:
-                        self.all_text += text
-                        self.pending_text += text
-            
-            # 对剩余待处理文本使用实时标点模型
-            if self.pending_text:
-                punc_text = self._apply_realtime_punc(self.pending_text)
-                self.text_with_punc += punc_text
-            
-            paraformer_text = self.text_with_punc
-            paraformer_time = time.time() - finalize_start
-            _log(f'Paraformer: {len(paraformer_text)}字 ({paraformer_time:.1f}s)', self.session_id)
-            
-            if progress_callback:
-                progress_callback(5, 100) # Paraformer 处理完成
-            
-            # 使用 VAD分段 + SenseVoice识别
-            sensevoice_text = ""
-            timestamps = []
-            backup_audio_id = None
-            
-            if len(self.full_audio) > 0:
-                sensevoice_start = time.time()
-                _log('SenseVoice 复检开始...', self.session_id)
-                try:
-                    # 保存音频文件（同时用于 SenseVoice 识别和备份）
-                    audio_array = np.array(self.full_audio, dtype=np.float32)
-                    
-                    # 生成备份文件名
-                    backup_audio_id = f"{self.session_id}_{int(time.time())}"
-                    backup_path = os.path.join(AUDIO_BACKUP_DIR, f"{backup_audio_id}.wav")
-                    sf.write(backup_path, audio_array, self.sample_rate)
-                    
-                    audio_duration_s = len(audio_array) / self.sample_rate
-                    _log(f'音频备份: {_short_sid(backup_audio_id)}.wav ({audio_duration_s:.1f}s)', self.session_id)
-                    
-                    # 调用SenseVoice识别（使用备份文件）
-                    sensevoice_text, timestamps = _run_sensevoice_with_timestamps(backup_path, progress_callback=progress_callback, sid=self.session_id)
-                    
-                    sensevoice_time = time.time() - sensevoice_start
-                    _log(f'SenseVoice: {len(sensevoice_text)}字, {len(timestamps)}段 ({sensevoice_time:.1f}s)', self.session_id)
-                except Exception as e:
-                    _log(f'SenseVoice 复检失败: {str(e)}', self.session_id, level='ERROR')
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                backup_future = executor.submit(self._write_backup_audio)
+                sensevoice_future = executor.submit(self._run_final_sensevoice, progress_callback, segment_callback)
+                paraformer_future = executor.submit(self._flush_paraformer)
+                paraformer_text = paraformer_future.result()
+                sensevoice_text, timestamps = sensevoice_future.result()
+                backup_audio_id = backup_future.result()
             
             total_time = time.time() - finalize_start
             _log(f'总处理耗时: {total_time:.1f}s', self.session_id)
@@ -825,7 +1420,7 @@ class RealtimeASR:
                 'paraformer_length': len(paraformer_text),
                 'sensevoice_length': len(sensevoice_text),
                 'timestamps': timestamps,  # VAD句级时间戳（SenseVoice原始文本）
-                'realtime_segments': self.segments,  # 实时粗略时间戳（备用）
+                'realtime_segments': self.segments.to_dicts(),  # 实时粗略时间戳（备用）
             }
             
             # 返回备份音频 ID，前端可用于下载服务端完整音频
@@ -837,9 +1432,9 @@ class RealtimeASR:
         except Exception as e:
             _log(f'最终识别错误: {str(e)}', self.session_id, level='ERROR')
             return {
-                'paraformer': self.text_with_punc + self.pending_text,
+                'paraformer': self.full_text,
                 'sensevoice': '',
-                'paraformer_length': len(self.text_with_punc + self.pending_text),
+                'paraformer_length': len(self.full_text),
                 'sensevoice_length': 0,
             }
 
@@ -863,9 +1458,7 @@ def handle_disconnect():
     保留宽限期（60s），等待客户端重连恢复。超时后自动清理。
     """
     session_id = request.sid
-    asr = None
-    with active_sessions_lock:
-        asr = active_sessions.pop(session_id, None)
+    asr = active_sessions.pop(session_id)
     
     # 如果会话正在录音且未进入 finalize，保留到宽限区
     if asr and not asr.is_finalizing:
@@ -912,15 +1505,14 @@ def handle_resume_recording(data):
     asr.session_id = new_sid
     
     # 绑定到新 socket
-    with active_sessions_lock:
-        active_sessions[new_sid] = asr
+    active_sessions.set(new_sid, asr)
     
     gap_seconds = time.time() - asr.start_time
     _log(f'会话恢复成功 (原 {old_short}, 已录 {gap_seconds:.0f}s)', new_sid)
     
     emit('resume_result', {
         'success': True,
-        'current_text': asr.text_with_punc + asr.pending_text,
+        'current_text': asr.full_text,
         'duration_s': gap_seconds,
     })
 
@@ -929,8 +1521,15 @@ def handle_resume_recording(data):
 def handle_start_recording():
     """开始录音"""
     session_id = request.sid
-    with active_sessions_lock:
-        active_sessions[session_id] = RealtimeASR(session_id)
+    if models_load_error:
+        _log('模型加载失败，拒绝开始录音', session_id, level='WARN')
+        emit('error', {'message': f'模型加载失败: {models_load_error}'})
+        return
+    if not models_ready.is_set():
+        _log('模型尚未加载完成，拒绝开始录音', session_id, level='WARN')
+        emit('error', {'message': '模型加载中，请稍后重试'})
+        return
+    active_sessions.set(session_id, RealtimeASR(session_id))
     _log('录音开始', session_id)
     emit('recording_started', {'status': 'ok'})
 
@@ -940,8 +1539,7 @@ def handle_audio_data(data):
     """接收音频数据"""
     session_id = request.sid
 
-    with active_sessions_lock:
-        asr = active_sessions.get(session_id)
+    asr = active_sessions.get(session_id)
  
     if not asr:
         emit('error', {'message': '会话不存在'})
@@ -961,7 +1559,7 @@ def handle_audio_data(data):
             if result:
                 emit('transcription', result)
     except Exception as e:
-        _log(f'音频处理错误: {str(e)}', session_id, level='ERROR')
+        _log_throttled('audio_data', f'音频处理错误: {str(e)}', session_id, level='ERROR')
         # 不发送错误，避免中断录音流程
 
 
@@ -970,8 +1568,7 @@ def handle_stop_recording():
     """停止录音"""
     session_id = request.sid
 
-    with active_sessions_lock:
-        asr = active_sessions.get(session_id)
+    asr = active_sessions.get(session_id)
  
     if not asr:
         emit('error', {'message': '会话不存在'})
@@ -993,10 +1590,16 @@ def handle_stop_recording():
         except:
             pass
 
+    def segment_callback(segment):
+        try:
+            socketio.emit('final_result_delta', segment, room=session_id)
+        except:
+            pass
+
     try:
         # 生成最终结果
         with asr.lock:
-            final_result = asr.finalize(progress_callback=progress_callback)
+            final_result = asr.finalize(progress_callback=progress_callback, segment_callback=segment_callback)
         try:
             emit('final_result', final_result)
         except:
@@ -1007,9 +1610,9 @@ def handle_stop_recording():
         # 尝试返回已有的部分结果
         try:
             emit('final_result', {
-                'paraformer': asr.text_with_punc + asr.pending_text,
+                'paraformer': asr.full_text,
                 'sensevoice': '',
-                'paraformer_length': len(asr.text_with_punc + asr.pending_text),
+                'paraformer_length': len(asr.full_text),
                 'sensevoice_length': 0,
                 'error': str(e)
              })
@@ -1017,13 +1620,24 @@ def handle_stop_recording():
             pass  # 客户端已断开
     finally:
         # 确保清理会话
-        with active_sessions_lock:
-            active_sessions.pop(session_id, None)
+        active_sessions.pop(session_id)
         _log('会话结束', session_id)
 
 
 # ==================== REST API 路由 ====================
 
+def _json_response(data, status=200):
+    """使用 orjson 序列化 JSON 响应
+    
+    orjson 直接输出 UTF-8（中文不转义为 \\uXXXX），序列化速度也明显快于 jsonify。
+    """
+    return Response(
+        orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json',
+    )
+
+
 @app.route('/api/asr/backup-audio/<backup_id>', methods=['GET'])
 def download_backup_audio(backup_id):
     """下载服务端备份的完整录音音频
@@ -1037,7 +1651,7 @@ def download_backup_audio(backup_id):
     backup_path = os.path.join(AUDIO_BACKUP_DIR, f"{safe_id}.wav")
     
     if not os.path.exists(backup_path):
-        return jsonify({"success": False, "error": "备份音频不存在或已过期"}), 404
+        return _json_response({"success": False, "error": "备份音频不存在或已过期"}, 404)
     
     return send_file(
         backup_path,
@@ -1056,7 +1670,7 @@ def delete_backup_audio(backup_id):
     if os.path.exists(backup_path):
         os.remove(backup_path)
     
-    return jsonify({"success": True})
+    return _json_response({"success": True})
 
 
 @app.route('/api/health', methods=['GET'])
@@ -1064,11 +1678,64 @@ def health_check():
     """
     健康检查接口
     """
-    return jsonify({
+    if models_load_error:
+        return _json_response({
+            "status": "error",
+            "message": f"模型加载失败: {models_load_error}",
+            "models_loaded": False,
+            "ready": False
+        }, 503)
+    return _json_response({
         "status": "ok",
         "message": "ASR API服务正常运行",
-        "models_loaded": asr_model is not None
-    }), 200
+        "models_loaded": asr_model is not None,
+        "ready": models_ready.is_set()
+    }, 200)
+
+
+def _is_audio_container(head):
+    """根据文件头魔数判断是否为支持的音频容器（wav/flac/ogg/mp3/m4a/aac/wma/webm）"""
+    if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+        return True
+    if head[:4] in (b'fLaC', b'OggS'):
+        return True
+    if head[:3] == b'ID3':  # 带 ID3 标签的 mp3
+        return True
+    if len(head) >= 2 and head[0] == 0xFF and (head[1] & 0xE0) == 0xE0:  # mp3 帧同步 / ADTS aac
+        return True
+    if head[4:8] == b'ftyp':  # MP4 容器（m4a/aac）
+        return True
+    if head[:4] == b'\x30\x26\xb2\x75':  # ASF 容器（wma）
+        return True
+    if head[:4] == b'\x1a\x45\xdf\xa3':  # EBML 容器（webm）
+        return True
+    return False
+
+
+def _result_cache_get(key):
+    """查询文件转录结果缓存，命中时标记为最近使用"""
+    with _result_cache_lock:
+        data = _result_cache.get(key)
+        if data is not None:
+            _result_cache.move_to_end(key)
+        return data
+
+
+def _result_cache_put(key, data):
+    """写入文件转录结果缓存，超出容量时淘汰最久未使用的条目"""
+    with _result_cache_lock:
+        _result_cache[key] = data
+        _result_cache.move_to_end(key)
+        while len(_result_cache) > RESULT_CACHE_SIZE:
+            _result_cache.popitem(last=False)
+
+
+def _audio_too_long_response(duration_s):
+    """音频超过 MAX_AUDIO_DURATION_S 时的 413 响应"""
+    return _json_response({
+        "success": False,
+        "error": f"音频时长 {duration_s:.0f}s 超过上限 {MAX_AUDIO_DURATION_S:.0f}s"
+    }, 413)
 
 
 @app.route('/api/asr/transcribe', methods=['POST'])
@@ -1080,13 +1747,14 @@ def transcribe_audio():
     - file: 音频文件
     - generate_timestamps: 是否生成时间戳（默认true）
     """
+    temp_upload_path = None
     try:
         # 检查是否有文件
         if 'file' not in request.files:
-            return jsonify({
+            return _json_response({
                 "success": False,
                 "error": "未找到上传的文件，请使用 'file' 字段上传音频文件"
-            }), 400
+            }, 400)
         
         file = request.files['file']
         generate_ts = request.form.get('generate_timestamps', 'true').lower() == 'true'
@@ -1094,41 +1762,100 @@ def transcribe_audio():
         
         # 检查文件名
         if file.filename == '':
-            return jsonify({
+            return _json_response({
                 "success": False,
                 "error": "文件名为空"
-            }), 400
+            }, 400)
         
         # 检查文件格式
         if not allowed_file(file.filename):
-            return jsonify({
+            return _json_response({
                 "success": False,
                 "error": f"不支持的文件格式，支持的格式: {', '.join(ALLOWED_EXTENSIONS)}"
-            }), 400
+            }, 400)
         
-        # 保存上传的文件到临时位置
-        temp_upload = tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1])
-        temp_upload_path = temp_upload.name
-        file.save(temp_upload_path)
-        temp_upload.close()
+        # 检查文件头魔数，扩展名与实际内容不符（非音频）的文件在解码前直接拒绝
+        head = file.stream.read(16)
+        file.stream.seek(0)
+        if not _is_audio_container(head):
+            return _json_response({
+                "success": False,
+                "error": "文件内容不是支持的音频格式"
+            }, 400)
         
-        # 将音频转换为WAV格式（确保所有格式都能被正确处理）
-        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_path = temp_wav.name
-        temp_wav.close()
+        # 读取上传内容并计算内容哈希：
+        # wav/flac/ogg 直接在内存中解码；其他格式（需 librosa/ffmpeg 解码）保存到临时文件（1MB 块流式拷贝）
+        hasher = hashlib.blake2b(digest_size=16)
+        if file.filename.rpartition('.')[2].lower() in _IN_MEMORY_EXTENSIONS:
+            upload_bytes = file.stream.read()
+            hasher.update(upload_bytes)
+            audio_source = io.BytesIO(upload_bytes)
+        else:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1], dir=UPLOAD_TMP_DIR) as temp_upload:
+                temp_upload_path = temp_upload.name
+                while True:
+                    chunk = file.stream.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    temp_upload.write(chunk)
+            audio_source = temp_upload_path
         
-        try:
+        # 相同文件重复转录时直接返回缓存结果
+        cache_key = (hasher.digest(), generate_ts)
+        cached_data = _result_cache_get(cache_key)
+        if cached_data is not None:
+            _log(f'文件转录命中缓存: {file.filename}', session_id)
+            return _json_response({
+                "success": True,
+                "data": cached_data,
+                "filename": file.filename,
+                "mode": "file_upload"
+            }, 200)
+        
+        if not models_ready.wait(timeout=MODELS_READY_TIMEOUT_S):
+            return _json_response({
+                "success": False,
+                "error": "模型加载中，请稍后重试"
+            }, 503)
+        if models_load_error:
+            return _json_response({
+                "success": False,
+                "error": f"模型加载失败: {models_load_error}"
+            }, 503)
+        
+        # 解码与推理在请求线程中执行（threading 模式下不阻塞 WebSocket），
+        # 以信号量限制同时处理的转录请求数，避免多请求并发解码/推理时 CPU 超额订阅；
+        # 解码缓冲区随名额借用，推理结束前 audio_data 可能仍引用它
+        with _transcribe_slots, _borrow_decode_buffer() as decode_slot:
             _log(f'文件转录: {file.filename}', session_id)
             
-            # 使用librosa读取并转换为WAV格式
-            audio_data, sr = librosa.load(temp_upload_path, sr=16000, mono=True)
-            sf.write(temp_path, audio_data, sr)
+            # 解码前先读取文件头中的时长，超长文件直接拒绝（libsndfile 无法识别的格式解码后再检查）
+            try:
+                header_duration_s = sf.info(audio_source).duration
+            except Exception:
+                header_duration_s = None
+            if header_duration_s is not None and header_duration_s > MAX_AUDIO_DURATION_S:
+                return _audio_too_long_response(header_duration_s)
+            if not temp_upload_path:
+                audio_source.seek(0)
+            
+            # 解码为 16kHz 单声道 float32 数组，直接交给模型（无需再写回 WAV 文件）
+            audio_data, sr = _load_audio(audio_source, suffix=os.path.splitext(file.filename)[1], decode_slot=decode_slot)
+            
+            # 计算音频时长（毫秒）：优先使用文件头中的时长，无法读取文件头时按解码结果计算
+            if header_duration_s is not None:
+                audio_duration_ms = int(header_duration_s * 1000)
+            else:
+                audio_duration_ms = int(len(audio_data) / sr * 1000)
             
-            # 计算音频时长（毫秒）
-            audio_duration_ms = int(len(audio_data) / sr * 1000)
+            # 解码完成后立即删除上传的临时文件（异常路径由 finally 兜底清理）
+            if temp_upload_path:
+                os.remove(temp_upload_path)
+                temp_upload_path = None
             
-            # 删除上传的临时文件
-            os.remove(temp_upload_path)
+            if audio_duration_ms > MAX_AUDIO_DURATION_S * 1000:
+                return _audio_too_long_response(audio_duration_ms / 1000)
             
             # 定义进度回调
             def progress_callback(current, total):
@@ -1141,43 +1868,47 @@ def transcribe_audio():
 
             # 使用SenseVoice识别（带VAD句级时间戳）
             if generate_ts:
-                sensevoice_text, timestamps = _run_sensevoice_with_timestamps(temp_path, progress_callback=progress_callback, sid=session_id)
+                sensevoice_text, timestamps = _run_sensevoice_with_timestamps(audio_data, progress_callback=progress_callback, sid=session_id)
                 _log(f'文件转录完成: {len(sensevoice_text)}字, {len(timestamps)}段', session_id)
             else:
                 if progress_callback:
                     progress_callback(10, 100)
-                sensevoice_text = _run_sensevoice(temp_path)
+                sensevoice_text = _run_sensevoice(audio_data)
                 if progress_callback:
                     progress_callback(100, 100)
                 timestamps = []
                 _log(f'文件转录完成: {len(sensevoice_text)}字', session_id)
             
             # 返回完整结果
-            return jsonify({
+            data = {
+                "text": sensevoice_text,
+                "length": len(sensevoice_text),
+                "model": "SenseVoice",
+                "timestamps": timestamps,
+                "duration_ms": audio_duration_ms
+            }
+            if sensevoice_text:  # 识别失败时返回空文本，不缓存
+                _result_cache_put(cache_key, data)
+            return _json_response({
                 "success": True,
-                "data": {
-                    "text": sensevoice_text,
-                    "length": len(sensevoice_text),
-                    "model": "SenseVoice",
-                    "timestamps": timestamps,
-                    "duration_ms": audio_duration_ms
-                },
+                "data": data,
                 "filename": file.filename,
                 "mode": "file_upload"
-            }), 200
-            
-        finally:
-            # 删除临时文件
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        
+            }, 200)
+    
     except Exception as e:
         _log(f'文件转录错误: {str(e)}', session_id, level='ERROR')
         traceback.print_exc()
-        return jsonify({
+        return _json_response({
             "success": False,
             "error": str(e)
-        }), 500
+        }, 500)
+    finally:
+        if temp_upload_path:
+            try:
+                os.remove(temp_upload_path)
+            except OSError:
+                pass
 
 
 @app.route('/api/asr/models', methods=['GET'])
@@ -1185,7 +1916,7 @@ def get_models_info():
     """
     获取模型信息
     """
-    return jsonify({
+    return _json_response({
         "success": True,
         "data": {
             "asr_model": "paraformer-zh-streaming",
@@ -1193,7 +1924,7 @@ def get_models_info():
             "sensevoice_model": "iic/SenseVoiceSmall",
             "models_loaded": asr_model is not None
         }
-    }), 200
+    }, 200)
 
 
 @app.route('/api/asr/formats', methods=['GET'])
@@ -1201,13 +1932,13 @@ def get_supported_formats():
     """
     获取支持的音频格式
     """
-    return jsonify({
+    return _json_response({
         "success": True,
         "data": {
             "formats": list(ALLOWED_EXTENSIONS),
             "description": "支持的音频文件格式"
         }
-    }), 200
+    }, 200)
 
 
 if __name__ == '__main__':
@@ -1224,8 +1955,8 @@ if __name__ == '__main__':
     print("   ' '=INFO  '!'=WARN  'X'=ERROR")
     print("=" * 50)
     
-    # 初始化模型
-    init_models()
+    # 后台初始化模型（服务立即开始监听，/api/health 的 ready 字段表示模型是否就绪）
+    threading.Thread(target=_init_models_background, name='init-models', daemon=True).start()
     
     # 启动服务（使用socketio.run支持WebSocket）
     socketio.run(app, host='0.0.0.0', port=5006, debug=False, allow_unsafe_werkzeug=True)
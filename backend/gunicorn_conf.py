@@ -0,0 +1,22 @@
+"""
+gunicorn 部署配置（替代 socketio.run 使用的 Werkzeug 开发服务器）
+
+启动：gunicorn -c gunicorn_conf.py asr_api_server:app
+
+- 只能单 worker：实时会话（含断线恢复）与模型都在进程内存中，多进程会导致会话找不到、显存翻倍
+- 使用 gthread 线程 worker，与 SocketIO 的 async_mode='threading' 一致，无需 gevent/eventlet monkey patch
+"""
+import os
+import threading
+
+bind = '0.0.0.0:5006'
+workers = 1
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 64))  # 每个 WebSocket 长连接占用一个线程
+timeout = 120
+
+
+def post_worker_init(worker):
+    """worker 启动后在后台加载模型（gunicorn 下不会执行 asr_api_server 的 __main__）"""
+    import asr_api_server
+    threading.Thread(target=asr_api_server._init_models_background, name='init-models', daemon=True).start()